@@ -2,6 +2,7 @@ import json
 import os
 import pathlib
 from typing import Any
+from typing import Dict
 from typing import List
 from typing import Optional
 
@@ -35,6 +36,14 @@ def append_file(container_id: Optional[str], content: List[str], file_path: str)
                 f.write(line)
 
 
+def append_bytes(container_id: Optional[str], content: bytes, file_path: str):
+    if container_id:
+        container.append_bytes(container_id, file_path, content)
+    else:
+        with open(file_path, "ab") as f:
+            f.write(content)
+
+
 def write_file(container_id: Optional[str], content: List[str], file_path: str):
     if container_id:
         container.write_file(container_id, file_path, content)
@@ -78,3 +87,20 @@ def is_file(container_id: Optional[str], file_path: str):
         return container.is_file(container_id, file_path)
     else:
         return os.path.isfile(file_path)
+
+
+def stat_paths(container_id: Optional[str], path_list: List[str]) -> Dict[str, str]:
+    if container_id:
+        return container.stat_paths(container_id, path_list)
+    stat_info = dict()
+    for path in path_list:
+        if os.path.isdir(path):
+            stat_info[path] = "directory"
+        elif os.path.isfile(path):
+            if os.path.getsize(path):
+                stat_info[path] = "regular file"
+            else:
+                stat_info[path] = "regular empty file"
+        elif os.path.exists(path):
+            stat_info[path] = "other"
+    return stat_info
@@ -1,6 +1,11 @@
+import io
 import json
 import os
 import random
+import shlex
+import subprocess
+import tarfile
+import tempfile
 from typing import Any
 from typing import Dict
 from typing import List
@@ -105,6 +110,41 @@ def pull_image(image_name: str, tag_name: str):
     return image
 
 
+def get_remote_digest(image_name: str, tag_name: str) -> Optional[str]:
+    client = get_client()
+    digest = None
+    try:
+        # only the manifest is queried from the registry, no layers are downloaded
+        registry_data = client.images.get_registry_data(
+            "{}:{}".format(image_name, tag_name)
+        )
+        digest = registry_data.id
+    except docker.errors.APIError as exp:  # type: ignore
+        emitter.warning(
+            "\t[docker-api][warning] unable to query registry: docker daemon error"
+        )
+        emitter.debug(exp)
+    except IOError as ex:
+        emitter.error(ex)
+        raise RuntimeError(
+            "\t[error] docker connection unsuccessful. Check if Docker is running or there is a connection to the specified host."
+        )
+    except Exception as ex:
+        emitter.warning(ex)
+        emitter.warning("[error] unable to query registry: unhandled exception")
+    return digest
+
+
+def is_latest_image(image: Any, image_name: str, tag_name: str) -> bool:
+    remote_digest = get_remote_digest(image_name, tag_name)
+    if not remote_digest:
+        return False
+    for repo_digest in image.attrs.get("RepoDigests", []):
+        if repo_digest.split("@")[-1] == remote_digest:
+            return True
+    return False
+
+
 def build_image(dockerfile_path: str, image_name: str):
     client = get_client()
     emitter.normal("\t\t[framework] building docker image {}".format(image_name))
@@ -294,9 +334,9 @@ def build_container(
             container_run_args["mem_limit"] = default_mem_limit
 
         emitter.debug(
-            "\t\t\t[framework] container {} is build with the following args {}".format(
-                container_name, container_run_args
-            )
+            "\t\t\t[framework] container %s is build with the following args %s",
+            container_name,
+            container_run_args,
         )
         container = client.containers.run(image_name, **container_run_args)
         container_id = container.id  # type: ignore
@@ -328,7 +368,11 @@ def build_container(
 
 
 def exec_command(
-    container_id: str, command: str, workdir="/experiment", env: Dict[str, str] = dict()
+    container_id: str,
+    command: str,
+    workdir="/experiment",
+    env: Dict[str, str] = dict(),
+    ascii_only=True,
 ) -> Tuple[int, Optional[Tuple[Optional[bytes], Optional[bytes]]]]:
     client = get_client()
     exit_code: int
@@ -337,7 +381,8 @@ def exec_command(
     output = None
     try:
         container = client.containers.get(container_id)
-        command = command.encode().decode("ascii", "ignore")
+        if ascii_only:
+            command = command.encode().decode("ascii", "ignore")
         print_command = "({}) {}".format(workdir, command)
         emitter.docker_command(print_command)
         exit_code, output = container.exec_run(  # type: ignore
@@ -459,6 +504,29 @@ def is_file_empty(container_id: str, file_path: str):
     return exec_command(container_id, exist_command)[0] != 0
 
 
+def stat_paths(container_id: str, path_list: List[str]) -> Dict[str, str]:
+    """file type of each existing path, queried with a single exec"""
+    if not path_list:
+        return dict()
+    stat_command = "stat -L -c '%n|%F' {} 2>/dev/null".format(
+        " ".join(shlex.quote(path) for path in path_list)
+    )
+    # paths are kept as given, so the output can be matched to the requested ones
+    _, output = exec_command(
+        container_id, "sh -c {}".format(shlex.quote(stat_command)), ascii_only=False
+    )
+    requested_paths = set(path_list)
+    stat_info = dict()
+    if output:
+        stdout, _ = output
+        if stdout:
+            for line in stdout.decode("utf-8", "replace").splitlines():
+                path, _, file_type = line.rstrip("\r").rpartition("|")
+                if path in requested_paths:
+                    stat_info[path] = file_type
+    return stat_info
+
+
 def fix_permissions(container_id: str, dir_path: str):
     permission_command = "chmod -R g+w  {}".format(dir_path)
     return exec_command(container_id, permission_command)
@@ -486,6 +554,103 @@ def copy_file_from_container(container_id: str, from_path: str, to_path: str):
     utilities.execute_command(copy_command)
 
 
+class ArchiveStream(io.RawIOBase):
+    """file-like view over the chunks returned by get_archive"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            try:
+                self.pending = next(self.chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def copy_dir_from_container(container_id: str, from_path: str, to_path_list: List[str]):
+    """copy a directory to several local paths, streaming it out of the container once"""
+    from_path = from_path.rstrip("/")
+    dir_name = os.path.basename(from_path)
+    emitter.docker_command("(archive) {}:{}".format(container_id, from_path))
+    try:
+        container = get_client().containers.get(container_id)
+        chunks, _ = container.get_archive(from_path)  # type: ignore
+        if len(to_path_list) == 1:
+            archive_stream = io.BufferedReader(ArchiveStream(chunks))
+            with tarfile.open(fileobj=archive_stream, mode="r|") as archive:
+                extract_archive(archive, dir_name, to_path_list[0])
+        else:
+            with tempfile.TemporaryFile() as tmp_file:
+                for chunk in chunks:
+                    tmp_file.write(chunk)
+                for to_path in to_path_list:
+                    tmp_file.seek(0)
+                    with tarfile.open(fileobj=tmp_file, mode="r|") as archive:
+                        extract_archive(archive, dir_name, to_path)
+    except docker.errors.NotFound as ex:  # type: ignore
+        emitter.warning(
+            "\t\t\t[warning] unable to copy {} from container: not found".format(
+                from_path
+            )
+        )
+        emitter.debug(ex)
+    except docker.errors.APIError as exp:  # type: ignore
+        emitter.warning(exp)
+        emitter.warning(
+            "\t\t\t[warning] unable to copy {} from container: docker daemon error".format(
+                from_path
+            )
+        )
+    except (tarfile.TarError, OSError) as ex:
+        emitter.warning(
+            "\t\t\t[warning] unable to copy {} from container: {}".format(from_path, ex)
+        )
+
+
+def extract_member(archive: tarfile.TarFile, member: tarfile.TarInfo, to_path: str):
+    # the archive comes from the tool container, unsafe members are skipped
+    if not hasattr(tarfile, "data_filter"):
+        # extraction filters are missing before python 3.8.17, check the paths only
+        for name in [member.name] + ([member.linkname] if member.islnk() else []):
+            if os.path.isabs(name) or ".." in name.split("/"):
+                emitter.warning(
+                    "\t\t\t[warning] skipping archive member: {}".format(member.name)
+                )
+                return
+        archive.extract(member, to_path)
+        return
+    try:
+        archive.extract(member, to_path, filter="data")
+    except tarfile.FilterError as ex:
+        emitter.warning("\t\t\t[warning] skipping archive member: {}".format(ex))
+
+
+def extract_archive(archive: tarfile.TarFile, dir_name: str, to_path: str):
+    """extract like docker cp: into to_path if it exists, otherwise as to_path"""
+    if os.path.isdir(to_path):
+        for member in archive:
+            extract_member(archive, member, to_path)
+        return
+    os.makedirs(to_path)
+    for member in archive:
+        if member.name == dir_name:
+            continue
+        member.name = os.path.relpath(member.name, dir_name)
+        if member.islnk():
+            # hard link targets are archive paths and need the same prefix removed
+            member.linkname = os.path.relpath(member.linkname, dir_name)
+        extract_member(archive, member, to_path)
+
+
 def copy_file_to_container(container_id: str, from_path: str, to_path: str):
     copy_command = "docker -H {} cp {} {}:{}".format(
         values.docker_host, from_path, container_id, to_path
@@ -522,6 +687,40 @@ def read_file(container_id: str, file_path: str, encoding="utf-8"):
 
 
 def append_file(container_id: str, file_path: str, content: List[str]):
+    append_bytes(container_id, file_path, "".join(content).encode())
+
+
+def append_bytes(container_id: str, file_path: str, content: bytes):
+    append_command = [
+        "docker",
+        "-H",
+        values.docker_host,
+        "exec",
+        "-i",
+        container_id,
+        "sh",
+        "-c",
+        "cat >> {}".format(shlex.quote(file_path)),
+    ]
+    emitter.command(" ".join(append_command))
+    # a single exec appends all chunks, piped through stdin
+    process = subprocess.run(
+        append_command,
+        input=content,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    if process.returncode != 0:
+        emitter.warning(
+            "\t\t\t[warning] unable to append to {} with docker exec: {}".format(
+                file_path, process.stderr.decode("utf-8", "ignore").strip()
+            )
+        )
+        # docker cp also works on stopped containers
+        append_bytes_with_copy(container_id, file_path, content)
+
+
+def append_bytes_with_copy(container_id: str, file_path: str, content: bytes):
     tmp_file_path = os.path.join(
         "/tmp", "append-file-{}".format(random.randint(0, 1000000))
     )
@@ -529,11 +728,15 @@ def append_file(container_id: str, file_path: str, content: List[str]):
         values.docker_host, container_id, file_path, tmp_file_path
     )
     utilities.execute_command(copy_command)
-    with open(tmp_file_path, "a") as f:
-        for line in content:
-            f.write(line)
+    with open(tmp_file_path, "ab") as f:
+        f.write(content)
     copy_command = "docker -H {} cp {} {}:{}".format(
         values.docker_host, tmp_file_path, container_id, file_path
     )
-    utilities.execute_command(copy_command)
+    if utilities.execute_command(copy_command) != 0:
+        emitter.warning(
+            "\t\t\t[warning] unable to append to {} in container {}".format(
+                file_path, container_id
+            )
+        )
     os.remove(tmp_file_path)
@@ -114,7 +114,10 @@ def docker_command(message):
     logger.docker_command(message)
 
 
-def debug(message):
+def debug(message, *args):
+    # arguments are interpolated once here, for both the console and the log file
+    if args:
+        message = str(message) % args
     if values.debug:
         prefix = "\t\t(debug) "
         write(message, COLOR.GREY, prefix=prefix, indent_level=2)
@@ -198,9 +198,9 @@ def get_tools() -> List[AbstractTool]:
         return tool_list
     for tool_name in values.tool_list:
         tool = configuration.load_tool(tool_name, values.task_type.get())
-        if not values.only_analyse:
-            tool.check_tool_exists()
         tool_list.append(tool)
+    if not values.only_analyse:
+        AbstractTool.check_tools_exist(tool_list)
     emitter.highlight(
         f"\t[framework] {values.task_type.get()}-tool(s): "
         + " ".join([x.name for x in tool_list])
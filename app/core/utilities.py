@@ -2,6 +2,7 @@ import base64
 import hashlib
 import os
 import re
+import shlex
 import shutil
 import signal
 import subprocess
@@ -11,7 +12,10 @@ from os.path import abspath
 from os.path import dirname
 from os.path import join
 from typing import Any
+from typing import List
 from typing import NoReturn
+from typing import Optional
+from typing import Union
 
 from app.core import emitter
 from app.core import logger
@@ -39,25 +43,69 @@ def escape_ansi(text: str):
     return result
 
 
-def execute_command(command: str, show_output=True, env=dict(), directory=None):
+def execute_command(
+    command: Union[str, List[str]],
+    show_output=True,
+    env=dict(),
+    directory=None,
+    output_fd: Optional[int] = None,
+):
     # Print executed command and execute it in console
-    command = command.encode().decode("ascii", "ignore")
+    # an argument list is executed directly, without going through the shell
+    command_args = None
+    if isinstance(command, list):
+        command_args = [arg.encode().decode("ascii", "ignore") for arg in command]
+        command = " ".join(shlex.quote(arg) for arg in command_args)
+    else:
+        command = command.encode().decode("ascii", "ignore")
     if not directory:
         directory = os.getcwd()
         print_command = command
     else:
         print_command = "[{}] {}".format(directory, command)
     emitter.command(print_command)
-    command = "{{ {} ;}} 2> {}".format(command, values.file_error_log)
-    if not show_output:
-        command += " > /dev/null"
+    if output_fd is not None:
+        # stdout and stderr are both written to the given file descriptor
+        stdout, stderr = output_fd, subprocess.STDOUT
+    elif command_args is not None:
+        stdout = subprocess.PIPE if show_output else subprocess.DEVNULL
+        stderr = subprocess.PIPE
+    else:
+        command = "{{ {} ;}} 2> {}".format(command, values.file_error_log)
+        if not show_output:
+            command += " > /dev/null"
+        stdout, stderr = subprocess.PIPE, None
     # print(command)
     new_env = os.environ.copy()
     new_env.update(env)
-    process = subprocess.Popen(
-        [command], stdout=subprocess.PIPE, shell=True, env=new_env, cwd=directory
-    )
+    if command_args is None:
+        process = subprocess.Popen(
+            [command],
+            stdout=stdout,
+            stderr=stderr,
+            shell=True,
+            env=new_env,
+            cwd=directory,
+        )
+    else:
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(directory)
+        try:
+            process = subprocess.Popen(
+                command_args,
+                stdout=stdout,
+                stderr=stderr,
+                env=new_env,
+                cwd=directory,
+            )
+        except (FileNotFoundError, PermissionError) as ex:
+            # same exit code as the shell for a command it cannot run
+            emitter.error("\t\t\t[error] unable to execute command: {}".format(ex))
+            return 127
     (output, error) = process.communicate()
+    if error is not None:
+        with open(values.file_error_log, "wb") as error_log:
+            error_log.write(error)
     # out is the output of the command, and err is the exit value
     return int(process.returncode)
 
@@ -156,6 +204,47 @@ def get_hash(str_value: str):
     return hash_value
 
 
+def is_same_file(src_path: str, dst_path: str):
+    return os.path.exists(dst_path) and os.path.samefile(src_path, dst_path)
+
+
+def copy_file(src_path: str, dst_path: str):
+    if is_same_file(src_path, dst_path):
+        return dst_path
+    return shutil.copy2(src_path, dst_path)
+
+
+def link_or_copy(src_path: str, dst_path: str):
+    # hard links avoid copying the data, fall back to a copy across devices
+    if is_same_file(src_path, dst_path):
+        return dst_path
+    if os.path.lexists(dst_path):
+        os.remove(dst_path)
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        shutil.copy2(src_path, dst_path)
+    return dst_path
+
+
+def copy_dir(src_dir: str, dst_dir: str, use_links=False):
+    # copies the content of src_dir into dst_dir, overwriting existing files
+    # only link files that are not modified afterwards, links alias the source
+    if not os.path.isdir(src_dir) or is_same_file(src_dir, dst_dir):
+        return
+    copy_function = link_or_copy if use_links else copy_file
+    try:
+        shutil.copytree(
+            src_dir,
+            dst_dir,
+            symlinks=True,
+            dirs_exist_ok=True,
+            copy_function=copy_function,
+        )
+    except shutil.Error as ex:
+        emitter.warning("\t\t\t[warning] incomplete copy of {}: {}".format(src_dir, ex))
+
+
 def check_space():
     emitter.normal("\t\t[framework] checking disk space")
     total, used, free = shutil.disk_usage("/")
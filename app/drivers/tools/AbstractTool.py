@@ -1,11 +1,17 @@
 import abc
+import contextvars
 import os
 import re
+import shlex
 import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from typing import Dict
+from typing import List
 from typing import Optional
+from typing import Tuple
 
 from app.core import abstractions
 from app.core import container
@@ -20,10 +26,19 @@ from app.core.utilities import execute_command
 from app.drivers.AbstractDriver import AbstractDriver
 from app.ui import ui
 
+# image resolved per (repository, tag), so each image is checked once per run
+# the flag records whether the image was pulled, only those are hash checked
+_image_check_cache: Dict[Tuple[str, str], Tuple[str, bool]] = {}
+_image_check_lock = threading.Lock()
+_image_locks: Dict[Tuple[str, str], threading.Lock] = {}
+# commands with shell syntax need a shell, others may be executed directly
+_shell_syntax = re.compile(r"[|&;<>()$`\\\"'*?\[\]#~=%{}!\n]")
+
 
 class AbstractTool(AbstractDriver):
     log_instrument_path = ""
     log_output_path = ""
+    log_output_template = ""
     image_name = ""
     invoke_command = ""
     name = ""
@@ -38,6 +53,8 @@ class AbstractTool(AbstractDriver):
     container_id = None
     is_instrument_only = False
     timestamp_fmt = "%a %d %b %Y %H:%M:%S %p"
+    max_check_workers = 8
+    log_buffer_limit = 64 * 1024
     current_task_profile_id = values.current_task_profile_id
     key_benchmark = definitions.KEY_BENCHMARK
     key_subject = definitions.KEY_SUBJECT
@@ -62,7 +79,8 @@ class AbstractTool(AbstractDriver):
         """add initialization commands to all tools here"""
         super().__init__()
         self.name = tool_name
-        if not self.stats:
+        # stats is only annotated on the class, each task type assigns its own instance
+        if not getattr(self, "stats", None):
             self.error_exit("Stats should be set in the abstract tool constructor!")
         self.is_ui_active = values.ui_active
         self.is_only_instrument = values.only_instrument
@@ -71,6 +89,9 @@ class AbstractTool(AbstractDriver):
         self.use_container = values.use_container
         self.use_valkyrie = values.use_valkyrie
         self.use_gpu = super().get_config_value("use_gpu")
+        self._log_buffer: Dict[str, List[bytes]] = {}
+        self._log_buffer_size: Dict[str, int] = {}
+        self._log_fds: Dict[str, int] = {}
 
     @abc.abstractmethod
     def analyse_output(self, dir_info, bug_id, fail_list):
@@ -94,14 +115,16 @@ class AbstractTool(AbstractDriver):
         return self.stats
 
     def clean_up(self):
+        self.flush_logs()
         if self.container_id:
             container.remove_container(self.container_id)
         else:
             if os.path.isdir(self.dir_expr):
-                rm_command = "rm -rf " + self.dir_expr
-                execute_command(rm_command)
+                shutil.rmtree(self.dir_expr, ignore_errors=True)
 
     def update_info(self, container_id, instrument_only, dir_info):
+        # log descriptors of a previous run may point at removed files
+        self.close_logs()
         self.container_id = container_id
         self.is_instrument_only = instrument_only
         self.update_dir_info(dir_info)
@@ -125,26 +148,31 @@ class AbstractTool(AbstractDriver):
             self.dir_setup = dir_info["local"]["setup"]
             self.dir_output = dir_info["local"]["artifacts"]
             self.dir_base_expr = values.dir_experiments
+        # braces in the directory are escaped so only the ids are substituted
+        self.log_output_template = os.path.join(
+            self.dir_logs.replace("{", "{{").replace("}", "}}"),
+            "{conf}-" + self.name.lower() + "-{bug}-output.log",
+        )
+
+    def append_timestamp(self, prefix="", suffix=""):
+        time_now = time.strftime(self.timestamp_fmt)
+        self.append_file(prefix + time_now + suffix, self.log_output_path)
 
     def timestamp_log(self):
-        time_now = time.strftime("%a %d %b %Y %H:%M:%S %p")
-        timestamp_txt = f"{time_now}"
-        self.append_file(timestamp_txt, self.log_output_path)
+        self.append_timestamp()
 
     def timestamp_log_start(self):
-        time_now = time.strftime("%a %d %b %Y %H:%M:%S %p")
-        timestamp_txt = f"{time_now}\n"
-        self.append_file(timestamp_txt, self.log_output_path)
+        self.append_timestamp(suffix="\n")
 
     def timestamp_log_end(self):
-        time_now = time.strftime("%a %d %b %Y %H:%M:%S %p")
-        timestamp_txt = f"\n{time_now}"
-        self.append_file(timestamp_txt, self.log_output_path)
+        self.append_timestamp(prefix="\n")
 
     def run_command(
         self, command_str, log_file_path="/dev/null", dir_path=None, env=dict()
     ):
         """executes the specified command at the given dir_path and save the output to log_file"""
+        # the command may read or append to a buffered file, write pending content first
+        self.flush_logs()
         if self.container_id:
             if not dir_path:
                 dir_path = "/experiment"
@@ -155,17 +183,48 @@ class AbstractTool(AbstractDriver):
                 stdout, stderr = output
                 if "/dev/null" not in log_file_path:
                     if stdout:
-                        self.append_file(stdout.decode("iso-8859-1"), log_file_path)
+                        self.append_bytes(stdout, log_file_path)
                     if stderr:
-                        self.append_file(stderr.decode("iso-8859-1"), log_file_path)
+                        self.append_bytes(stderr, log_file_path)
         else:
             if not dir_path:
                 dir_path = self.dir_expr
-            command_str += " >> {0} 2>&1".format(log_file_path)
-            exit_code = execute_command(command_str, env=env, directory=dir_path)
+            log_fd = self.get_log_fd(os.path.join(dir_path, log_file_path))
+            command = command_str
+            if not _shell_syntax.search(command_str):
+                command_args = shlex.split(command_str)
+                # shell builtins and unknown commands are left to the shell
+                if command_args and self.is_executable(command_args[0], dir_path, env):
+                    command = command_args
+            exit_code = execute_command(
+                command, env=env, directory=dir_path, output_fd=log_fd
+            )
         return exit_code
 
+    def is_executable(self, command_name, dir_path, env):
+        if os.sep in command_name:
+            command_path = os.path.join(dir_path, command_name)
+            return os.path.isfile(command_path) and os.access(command_path, os.X_OK)
+        search_path = env.get("PATH", os.environ.get("PATH"))
+        return shutil.which(command_name, path=search_path) is not None
+
+    def get_log_fd(self, log_file_path):
+        """open the log file once in append mode and reuse it for later commands"""
+        if log_file_path not in self._log_fds:
+            os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
+            self._log_fds[log_file_path] = os.open(
+                log_file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+            )
+        return self._log_fds[log_file_path]
+
+    def close_logs(self):
+        self.flush_logs()
+        for log_fd in self._log_fds.values():
+            os.close(log_fd)
+        self._log_fds.clear()
+
     def process_status(self, status: int):
+        self.flush_logs()
         if status != 0:
             self.stats.error_stats.is_error = True
             values.experiment_status.set(TaskStatus.FAIL_IN_TOOL)
@@ -204,53 +263,25 @@ class AbstractTool(AbstractDriver):
             else:
                 repo_name = self.image_name
                 tag_name = "latest"
-            if not container.image_exists(repo_name, tag_name):
-                emitter.warning(
-                    "\t[framework] docker image {}:{} not found in local docker registry".format(
-                        repo_name, tag_name
-                    )
-                )
-                image = container.pull_image(repo_name, tag_name)
-                if image is None:
-                    utilities.error_exit(
-                        "\t[framework] {} does not provide a Docker image in Dockerhub".format(
-                            self.name
-                        )
-                    )
-                if values.secure_hash and not image.id.startswith(self.hash_digest):
-                    utilities.error_exit(
-                        "\t[framework] pulled an image for {} whose hash did start with the prefix in the driver. aborting".format(
-                            self.name
-                        )
-                    )
-                    # container.build_tool_image(repo_name, tag_name)
-            else:
-                # Image may exist but need to be sure it is the latest one
-                emitter.information(
-                    "\t\t[framework] docker image found locally for {}".format(
+            image_key = (repo_name, tag_name)
+            with _image_check_lock:
+                image_lock = _image_locks.setdefault(image_key, threading.Lock())
+            # tools sharing an image wait for the first check instead of pulling again
+            with image_lock:
+                if image_key not in _image_check_cache:
+                    self.resolve_tool_image(repo_name, tag_name)
+            # tools sharing an image may expect a different digest
+            image_id, is_pulled = _image_check_cache[image_key]
+            if (
+                values.secure_hash
+                and is_pulled
+                and not image_id.startswith(self.hash_digest)
+            ):
+                utilities.error_exit(
+                    "\t[framework] the image for {} does not match the hash prefix in the driver. aborting".format(
                         self.name
                     )
                 )
-                # Get the local image
-                local_image = container.get_image(repo_name, tag_name)
-                # Then try pulling. If it is the same one we are quick
-                # If not we have to wait but it is safer than getting stale results.
-                # In theory this has a supply chain vulnerability but we can assume
-                # That the storage is safe
-                if values.use_latest_image:
-                    remote_image = container.pull_image(repo_name, tag_name)
-
-                    if remote_image and local_image.id != remote_image.id:  # type: ignore
-                        emitter.information(
-                            "\t[framework] docker image is not the same as the one in the repository. Will have to rebuild"
-                        )
-                        if values.secure_hash and not remote_image.id.startswith(
-                            self.hash_digest
-                        ):
-                            utilities.error_exit(
-                                "\t[framework] secure mode is enabled. aborting"
-                            )
-                        values.rebuild_all = True
 
         else:
             local_path = shutil.which(self.name.lower())
@@ -258,11 +289,85 @@ class AbstractTool(AbstractDriver):
                 error_exit("{} not Found".format(self.name))
         return
 
+    def resolve_tool_image(self, repo_name, tag_name):
+        """pull the tool image if needed and record its id in the image cache"""
+        if not container.image_exists(repo_name, tag_name):
+            emitter.warning(
+                "\t[framework] docker image {}:{} not found in local docker registry".format(
+                    repo_name, tag_name
+                )
+            )
+            image = container.pull_image(repo_name, tag_name)
+            if image is None:
+                utilities.error_exit(
+                    "\t[framework] {} does not provide a Docker image in Dockerhub".format(
+                        self.name
+                    )
+                )
+            if values.secure_hash and not image.id.startswith(self.hash_digest):
+                utilities.error_exit(
+                    "\t[framework] pulled an image for {} whose hash did start with the prefix in the driver. aborting".format(
+                        self.name
+                    )
+                )
+                # container.build_tool_image(repo_name, tag_name)
+            image_id = image.id
+            is_pulled = True
+        else:
+            # Image may exist but need to be sure it is the latest one
+            emitter.information(
+                "\t\t[framework] docker image found locally for {}".format(self.name)
+            )
+            # Get the local image
+            local_image = container.get_image(repo_name, tag_name)
+            image_id = local_image.id  # type: ignore
+            is_pulled = False
+            # Then compare digests with the registry and pull only if they differ.
+            # We have to wait but it is safer than getting stale results.
+            # In theory this has a supply chain vulnerability but we can assume
+            # That the storage is safe
+            if values.use_latest_image and not container.is_latest_image(
+                local_image, repo_name, tag_name
+            ):
+                remote_image = container.pull_image(repo_name, tag_name)
+
+                if remote_image and local_image.id != remote_image.id:  # type: ignore
+                    emitter.information(
+                        "\t[framework] docker image is not the same as the one in the repository. Will have to rebuild"
+                    )
+                    if values.secure_hash and not remote_image.id.startswith(
+                        self.hash_digest
+                    ):
+                        utilities.error_exit(
+                            "\t[framework] secure mode is enabled. aborting"
+                        )
+                    values.rebuild_all = True
+                    image_id = remote_image.id
+                    is_pulled = True
+        with _image_check_lock:
+            _image_check_cache[(repo_name, tag_name)] = (image_id, is_pulled)
+
+    @classmethod
+    def check_tools_exist(cls, tool_list):
+        """check the tools concurrently, image lookups and pulls are network bound"""
+        if not tool_list:
+            return
+        max_workers = min(cls.max_check_workers, len(tool_list))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # worker threads do not inherit context variables such as values.task_type
+            futures = [
+                executor.submit(contextvars.copy_context().run, tool.check_tool_exists)
+                for tool in tool_list
+            ]
+            for future in futures:
+                future.result()
+
     def update_experiment_status(self, status: str):
         ui.update_current_job(status)
 
     def post_process(self):
         """Any post-processing required for the repair"""
+        self.close_logs()
         if self.container_id:
             container.stop_container(self.container_id)
         if values.use_purge:
@@ -275,62 +380,109 @@ class AbstractTool(AbstractDriver):
 
     def save_artifacts(self, dir_info):
         """Store all artifacts from the tool"""
+        self.flush_logs()
         dir_results = dir_info["results"]
         dir_artifacts = dir_info["artifacts"]
         dir_logs = dir_info["logs"]
         if self.container_id:
-            container.copy_file_from_container(
-                self.container_id, self.dir_output, dir_results
-            )
-            container.copy_file_from_container(
-                self.container_id, self.dir_logs, dir_results
-            )
-            container.copy_file_from_container(
-                self.container_id, self.dir_output, dir_artifacts
-            )
+            # the logs directory is mounted, so only results and artifacts are copied
+            copy_jobs = [
+                (self.dir_output, [dir_results, dir_artifacts]),
+                (self.dir_logs, [dir_results]),
+            ]
+            with ThreadPoolExecutor(max_workers=len(copy_jobs)) as executor:
+                list(
+                    executor.map(
+                        lambda job: container.copy_dir_from_container(
+                            self.container_id, job[0], job[1]
+                        ),
+                        copy_jobs,
+                    )
+                )
         else:
-            save_command = "cp -rf {}/* {};".format(self.dir_output, dir_results)
+            # artifacts are final once the tool ended, logs are still appended to
+            utilities.copy_dir(self.dir_output, dir_results, use_links=True)
             if self.dir_logs != "":
-                save_command += "cp -rf {}/* {};".format(self.dir_logs, dir_results)
+                utilities.copy_dir(self.dir_logs, dir_results)
             if dir_artifacts != "":
-                save_command += "cp -rf {}/* {};".format(self.dir_output, dir_artifacts)
+                utilities.copy_dir(self.dir_output, dir_artifacts, use_links=True)
             if dir_logs != "":
-                save_command += "cp -rf {}/* {}".format(self.dir_logs, dir_logs)
-
-            execute_command(save_command)
+                utilities.copy_dir(self.dir_logs, dir_logs)
 
     def read_file(self, file_path, encoding="utf-8"):
+        self.flush_logs()
         return abstractions.read_file(self.container_id, file_path, encoding)
 
     def read_json(self, file_path, encoding="utf-8"):
+        self.flush_logs()
         return abstractions.read_json(self.container_id, file_path, encoding)
 
     def append_file(self, content, file_path):
-        return abstractions.append_file(self.container_id, content, file_path)
+        if not isinstance(content, str):
+            content = "".join(content)
+        self.append_bytes(content.encode(), file_path)
+
+    def append_bytes(self, content, file_path):
+        """buffer the content, it is written once the buffer is full or flushed"""
+        self._log_buffer.setdefault(file_path, []).append(content)
+        buffer_size = self._log_buffer_size.get(file_path, 0) + len(content)
+        self._log_buffer_size[file_path] = buffer_size
+        if buffer_size >= self.log_buffer_limit:
+            self.flush_logs(file_path)
+
+    def flush_logs(self, file_path=None):
+        """write the buffered content of each file (or only file_path) at once"""
+        if file_path is None:
+            file_list = list(self._log_buffer.keys())
+        else:
+            file_list = [file_path]
+        for path in file_list:
+            content = self._log_buffer.pop(path, None)
+            self._log_buffer_size.pop(path, None)
+            if content:
+                abstractions.append_bytes(self.container_id, b"".join(content), path)
 
     def write_file(self, content, file_path):
+        self.flush_logs()
         return abstractions.write_file(self.container_id, content, file_path)
 
     def write_json(self, data, file_path):
+        self.flush_logs()
         return abstractions.write_json(self.container_id, data, file_path)
 
     def list_dir(self, dir_path, regex=None):
+        self.flush_logs()
         return abstractions.list_dir(self.container_id, dir_path, regex)
 
     def is_dir(self, dir_path):
+        self.flush_logs()
         return abstractions.is_dir(self.container_id, dir_path)
 
     def is_file(self, file_path):
+        self.flush_logs()
         return abstractions.is_file(self.container_id, file_path)
 
+    def stat_many(self, path_list):
+        """map each existing path to its file type, missing paths are left out"""
+        self.flush_logs()
+        return abstractions.stat_paths(self.container_id, path_list)
+
+    def is_file_batch(self, path_list):
+        stat_info = self.stat_many(path_list)
+        return {path: "regular" in stat_info.get(path, "") for path in path_list}
+
     def get_output_log_path(self):
         # parse this file for time info
-        if not self.log_output_path:
-            regex = re.compile("(.*-output.log$)")
-            for _, _, files in os.walk(self.dir_logs):
-                for file in files:
-                    if regex.match(file) and self.name in file:
-                        self.log_output_path = os.path.join(self.dir_logs, file)
+        self.flush_logs()
+        if not self.log_output_path and os.path.isdir(self.dir_logs):
+            with os.scandir(self.dir_logs) as entries:
+                for entry in entries:
+                    if (
+                        entry.name.endswith("-output.log")
+                        and self.name in entry.name
+                        and entry.is_file()
+                    ):
+                        self.log_output_path = entry.path
                         break
         return self.log_output_path
 
@@ -1,5 +1,4 @@
 import abc
-from os.path import join
 
 from app.core import definitions
 from app.core import utilities
@@ -42,9 +41,8 @@ class AbstractAnalyzeTool(AbstractTool):
         self.emit_normal("executing analysis command")
         task_conf_id = repair_config_info[definitions.KEY_ID]
         bug_id = str(bug_info[definitions.KEY_BUG_ID])
-        self.log_output_path = join(
-            self.dir_logs,
-            "{}-{}-{}-output.log".format(task_conf_id, self.name.lower(), bug_id),
+        self.log_output_path = self.log_output_template.format(
+            conf=task_conf_id, bug=bug_id
         )
         self.run_command("mkdir {}".format(self.dir_output), "dev/null", "/")
 
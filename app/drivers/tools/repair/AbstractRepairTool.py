@@ -1,5 +1,4 @@
 import abc
-import os
 from datetime import datetime
 from os.path import join
 
@@ -90,10 +89,9 @@ class AbstractRepairTool(AbstractTool):
         self.emit_normal("executing repair command")
         task_conf_id = repair_config_info[definitions.KEY_ID]
         bug_id = str(bug_info[definitions.KEY_BUG_ID])
-        log_file_name = "{}-{}-{}-output.log".format(
-            task_conf_id, self.name.lower(), bug_id
+        self.log_output_path = self.log_output_template.format(
+            conf=task_conf_id, bug=bug_id
         )
-        self.log_output_path = os.path.join(self.dir_logs, log_file_name)
         self.run_command("mkdir {}".format(self.dir_output), "dev/null", "/")
         return
 
@@ -95,10 +95,12 @@ class GenProg(AbstractRepairTool):
         )
         dir_patch_local = self.dir_output + "/patches"
         if self.is_dir(dir_repair_local):
+            file_list = [f for f in self.list_dir(dir_repair_local) if ".c" in f]
+            is_file_map = self.is_file_batch(
+                [join(dir_repair_local, f) for f in file_list]
+            )
             output_patch_list = [
-                f
-                for f in self.list_dir(dir_repair_local)
-                if self.is_file(join(dir_repair_local, f)) and ".c" in f
+                f for f in file_list if is_file_map[join(dir_repair_local, f)]
             ]
             for f in output_patch_list:
                 patched_source = dir_repair_local + "/" + f
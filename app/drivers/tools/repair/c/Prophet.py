@@ -120,10 +120,12 @@ class Prophet(AbstractRepairTool):
         patch_id = 0
         dir_patch_local = join(self.dir_output, "patches")
         if self.is_dir(dir_patch_local):
+            file_list = [f for f in self.list_dir(dir_patch_local) if ".c" in f]
+            is_file_map = self.is_file_batch(
+                [join(dir_patch_local, f) for f in file_list]
+            )
             output_patch_list = [
-                f
-                for f in self.list_dir(dir_patch_local)
-                if self.is_file(join(dir_patch_local, f)) and ".c" in f
+                f for f in file_list if is_file_map[join(dir_patch_local, f)]
             ]
             for f in output_patch_list:
                 patched_source = dir_patch_local + "/" + f